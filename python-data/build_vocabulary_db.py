@@ -19,18 +19,16 @@ import sqlite3
 import csv
 import os
 import re
-from typing import Optional, Dict, Set, Tuple
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import closing
+from typing import Optional, Dict, Set, Tuple, Iterable, Iterator
 from dataclasses import dataclass, field
+from functools import lru_cache
+from itertools import chain, islice
+from pathlib import Path
 from enum import Enum
 
-# 尝试导入 xlrd (读取高考词汇 xls)
-try:
-    import xlrd
-    XLRD_AVAILABLE = True
-except ImportError:
-    XLRD_AVAILABLE = False
-    print("Warning: xlrd not installed. Run: pip install xlrd")
-
 # 尝试导入 nltk wordnet
 try:
     import nltk
@@ -90,6 +88,10 @@ POS_STANDARD = {
 }
 
 
+# 数据来源标记，写入 data_sources 字段时按此顺序拼接
+DATA_SOURCE_ORDER = ('ecdict', 'wordnet', 'coca', 'cefr')
+
+
 # CEFR 等级映射 (数字 -> 字符串)
 CEFR_LEVEL_MAP = {
     1: 'A1',
@@ -101,6 +103,11 @@ CEFR_LEVEL_MAP = {
 }
 
 
+def normalize_word(word: Optional[str]) -> str:
+    """stardict 词头的规范化形式（小写、去除首尾空白），作为输出库中的 word"""
+    return word.lower().strip() if word else ""
+
+
 def cefr_from_float(level: float) -> str:
     """将浮点数等级转换为 CEFR 字符串"""
     if level <= 0:
@@ -110,13 +117,82 @@ def cefr_from_float(level: float) -> str:
     return CEFR_LEVEL_MAP.get(rounded, "")
 
 
-@dataclass
+@lru_cache(maxsize=None)
+def normalize_pos(raw_pos: str) -> str:
+    """
+    标准化词性格式（相同的原始词性串大量重复，结果按输入缓存）
+    输入: "a:99/t:1" 或 "n:100" 或 "noun" 等
+    输出: "adj,v" 或 "n" 等（统一格式，按频率排序）
+    """
+    if not raw_pos:
+        return ""
+
+    pos_list = []
+
+    # 解析 ECDICT 格式: "a:99/t:1" 或 "n:4/v:96"
+    if ':' in raw_pos:
+        parts = raw_pos.split('/')
+        pos_freq = []
+        for part in parts:
+            if ':' in part:
+                pos_code, freq_str = part.split(':')
+                pos_code = pos_code.strip().lower()
+                try:
+                    freq = int(freq_str)
+                except ValueError:
+                    freq = 0
+                # 标准化词性
+                std_pos = POS_STANDARD.get(pos_code, '')
+                if std_pos and std_pos != 'unknown':
+                    pos_freq.append((std_pos, freq))
+
+        # 按频率降序排序，去重
+        pos_freq.sort(key=lambda x: -x[1])
+        seen = set()
+        for pos, _ in pos_freq:
+            if pos not in seen:
+                pos_list.append(pos)
+                seen.add(pos)
+    else:
+        # 简单格式: "noun" 或 "n"
+        pos_code = raw_pos.strip().lower()
+        std_pos = POS_STANDARD.get(pos_code, '')
+        if std_pos and std_pos != 'unknown':
+            pos_list.append(std_pos)
+
+    return ','.join(pos_list)
+
+
+@lru_cache(maxsize=None)
+def get_pos_from_wordnet(word: str) -> str:
+    """从 WordNet 获取词性（按使用频率排序），结果按单词缓存"""
+    if not WORDNET_AVAILABLE:
+        return ""
+
+    try:
+        synsets = wn.synsets(word)
+        if not synsets:
+            return ""
+
+        # 统计各词性的 synset 数量（作为频率近似）
+        pos_count = Counter(POS_STANDARD.get(syn.pos(), '') for syn in synsets)
+        pos_count.pop('', None)
+        pos_count.pop('unknown', None)
+
+        # 按数量降序排序
+        return ','.join(p for p, _ in pos_count.most_common())
+    except Exception:
+        return ""
+
+
+@dataclass(slots=True)
 class WordEntry:
-    """单词条目数据结构"""
+    """
+    单词条目数据结构（只包含需要在 Python 中计算的字段）
+    音标、释义、词形变化等文本列不经过 Python，入库时按 src_rowid 从 stardict 直接拷贝
+    """
     word: str
-    phonetic: str = ""
-    definition_en: str = ""
-    definition_cn: str = ""
+    src_rowid: int = 0  # 在 stardict 表中的 rowid
     pos: str = ""
 
     # 等级与词频
@@ -136,11 +212,57 @@ class WordEntry:
     is_ielts: bool = False
     is_gre: bool = False
 
-    # 扩展信息
-    exchange: str = ""  # 时态变形
-
     # 数据源追踪（用于调试和质量保证）
-    data_sources: str = ""
+    data_sources: Set[str] = field(default_factory=set)
+
+
+# 在 Python 中计算、写入临时表 picked 的列（顺序与 entry_to_tuple 一致）
+PICKED_COLUMNS = (
+    'src_rowid', 'word', 'pos',
+    'cefr_level', 'collins_star', 'coca_rank', 'bnc_rank',
+    'is_oxford_3000', 'is_cet4', 'is_cet6', 'is_zk', 'is_gk', 'is_ky',
+    'is_toefl', 'is_ielts', 'is_gre', 'data_sources',
+)
+
+# 多行 VALUES 插入时每条语句的行数；SQLite 旧版本单条语句最多 999 个绑定参数
+INSERT_BATCH_ROWS = 999 // len(PICKED_COLUMNS)
+
+
+def insert_sql(rows: int) -> str:
+    """
+    生成一次向 picked 插入 rows 行的 INSERT 语句
+    单词重复时原地更新为后一行的值，保留首次出现的位置（rowid），入库顺序不变
+    """
+    placeholders = "(" + ", ".join("?" * len(PICKED_COLUMNS)) + ")"
+    updates = ", ".join(f"{col} = excluded.{col}" for col in PICKED_COLUMNS if col != 'word')
+    return (
+        f"INSERT INTO picked ({', '.join(PICKED_COLUMNS)}) "
+        f"VALUES {', '.join([placeholders] * rows)} "
+        f"ON CONFLICT(word) DO UPDATE SET {updates}"
+    )
+
+
+def entry_to_tuple(entry: WordEntry) -> Tuple:
+    """将词条转换为 picked 表的插入参数（顺序与 PICKED_COLUMNS 一致）"""
+    return (
+        entry.src_rowid,
+        entry.word,
+        entry.pos,
+        entry.cefr_level,
+        entry.collins_star,
+        entry.coca_rank,
+        entry.bnc_rank,
+        int(entry.is_oxford_3000),
+        int(entry.is_cet4),
+        int(entry.is_cet6),
+        int(entry.is_zk),
+        int(entry.is_gk),
+        int(entry.is_ky),
+        int(entry.is_toefl),
+        int(entry.is_ielts),
+        int(entry.is_gre),
+        ",".join(s for s in DATA_SOURCE_ORDER if s in entry.data_sources),
+    )
 
 
 class VocabularyBuilder:
@@ -160,18 +282,22 @@ class VocabularyBuilder:
         r'^[a-z]{1,2}$',       # 1-2字母的词（后面会特殊处理少数有意义的）
     ]
 
-    # 允许的单字母词
-    ALLOWED_SINGLE_LETTERS = {'i', 'a'}
+    # 预编译为单个正则，每个词只需匹配一次
+    _EXCLUDE_RE = re.compile("|".join(f"(?:{p})" for p in EXCLUDE_PATTERNS))
 
-    # 允许的双字母词（有实际意义的）
-    ALLOWED_TWO_LETTERS = {
+    # 允许的单字母/双字母词（有实际意义的）
+    ALLOWED_SHORT = frozenset({
+        'i', 'a',
         'am', 'an', 'as', 'at', 'be', 'by', 'do', 'go', 'he', 'if',
         'in', 'is', 'it', 'me', 'my', 'no', 'of', 'on', 'or', 'so',
         'to', 'up', 'us', 'we', 'ok', 'ox', 'ax'
-    }
+    })
+
+    # ECDICT tag 字段中的考试标签
+    _EXAM_TAGS = frozenset({'zk', 'gk', 'cet4', 'cet6', 'ky', 'toefl', 'ielts', 'gre'})
 
     # 高频无意义词/噪音词（需要过滤掉）
-    STOPWORDS = {
+    STOPWORDS = frozenset({
         # 重复字母组合
         'aa', 'aaa', 'aaaa', 'bb', 'bbb', 'cc', 'ccc', 'dd', 'ddd',
         'ee', 'eee', 'ff', 'fff', 'gg', 'ggg', 'hh', 'hhh', 'ii', 'iii',
@@ -189,11 +315,11 @@ class VocabularyBuilder:
         'plz', 'cuz', 'coz', 'gonna', 'wanna', 'gotta', 'kinda', 'sorta',
         # 其他噪音
         'etc', 'vs', 'ie', 'eg', 'nb', 'ps', 'aka', 'diy', 'faq',
-    }
+    })
 
     def __init__(self, data_dir: str):
         self.data_dir = data_dir
-        self.words: Dict[str, WordEntry] = {}
+        self.stardict_path = os.path.join(data_dir, "stardict 2.db")
         self.coca_ranks: Dict[str, int] = {}
         self.cefr_data: Dict[str, float] = {}  # word -> cefr level (1-6)
         self.gaokao_words: Set[str] = set()    # 高考词汇集合
@@ -208,17 +334,26 @@ class VocabularyBuilder:
             return
 
         with open(coca_path, 'r', encoding='utf-8-sig') as f:
-            reader = csv.DictReader(f)
+            reader = csv.reader(f)
+            # 按表头定位列，逐行按下标取值，避免为每行构造 dict
+            header = next(reader, [])
+            try:
+                lemma_idx = header.index('lemma')
+                rank_idx = header.index('rank')
+            except ValueError:
+                print(f"  Warning: {coca_path} missing 'lemma' or 'rank' column")
+                return
+
             for row in reader:
                 try:
-                    word = row.get('lemma', '').lower().strip()
-                    rank = int(row.get('rank', 0))
-                    if word and rank > 0:
-                        # 只保留排名最高的（数字最小）
-                        if word not in self.coca_ranks or rank < self.coca_ranks[word]:
-                            self.coca_ranks[word] = rank
-                except (ValueError, KeyError):
+                    word = row[lemma_idx].lower().strip()
+                    rank = int(row[rank_idx])
+                except (ValueError, IndexError):
                     continue
+                if word and rank > 0:
+                    # 只保留排名最高的（数字最小）
+                    if word not in self.coca_ranks or rank < self.coca_ranks[word]:
+                        self.coca_ranks[word] = rank
 
         print(f"  Loaded {len(self.coca_ranks)} COCA entries")
 
@@ -231,49 +366,53 @@ class VocabularyBuilder:
             print(f"  Warning: {db_path} not found")
             return
 
-        conn = sqlite3.connect(db_path)
-        cursor = conn.cursor()
+        with closing(sqlite3.connect(db_path)) as conn:
+            cursor = conn.cursor()
 
-        # 查询每个单词的平均 CEFR 等级（一个词可能有多个词性，取平均）
-        cursor.execute("""
-            SELECT w.word, AVG(wp.level) as avg_level
-            FROM words w
-            JOIN word_pos wp ON w.word_id = wp.word_id
-            GROUP BY w.word
-        """)
-
-        for row in cursor.fetchall():
-            word = row[0].lower().strip()
-            level = row[1]
-            if word and level:
-                self.cefr_data[word] = level
-
-        conn.close()
+            # 查询每个单词的平均 CEFR 等级（一个词可能有多个词性，取平均）
+            cursor.execute("""
+                SELECT w.word, AVG(wp.level) as avg_level
+                FROM words w
+                JOIN word_pos wp ON w.word_id = wp.word_id
+                GROUP BY w.word
+            """)
+
+            for row in cursor:
+                word = row[0].lower().strip()
+                level = row[1]
+                if word and level:
+                    self.cefr_data[word] = level
         print(f"  Loaded {len(self.cefr_data)} CEFR entries")
 
     def load_gaokao_vocabulary(self) -> None:
-        """加载高考 3500 词汇表"""
+        """
+        加载高考 3500 词汇表
+        CSV 由原 xls 一次性导出，表格结构不变（首行表头，第2列是单词）：
+        libreoffice --headless --convert-to 'csv:Text - txt - csv (StarCalc):44,34,76' "1、高考3500个英语单词表(带音标.xls"
+        （76 即 UTF-8，不指定时 LibreOffice 按系统区域编码导出，中文列会乱码）
+        """
         print("Loading Gaokao vocabulary...")
-
-        if not XLRD_AVAILABLE:
-            print("  Warning: xlrd not available, skipping Gaokao vocabulary")
-            return
-
-        xls_path = os.path.join(self.data_dir, "1、高考3500个英语单词表(带音标.xls")
-
-        if not os.path.exists(xls_path):
-            print(f"  Warning: {xls_path} not found")
+        csv_path = os.path.join(self.data_dir, "1、高考3500个英语单词表(带音标.csv")
+
+        if not os.path.exists(csv_path):
+            print(f"  Warning: {csv_path} not found")
+            xls_path = os.path.splitext(csv_path)[0] + ".xls"
+            if os.path.exists(xls_path):
+                print("  Export it from the xls first:")
+                print(f"    libreoffice --headless --convert-to 'csv:Text - txt - csv (StarCalc):44,34,76' "
+                      f"--outdir \"{self.data_dir}\" \"{xls_path}\"")
             return
 
         try:
-            wb = xlrd.open_workbook(xls_path)
-            sheet = wb.sheet_by_index(0)
+            with open(csv_path, 'r', encoding='utf-8-sig') as f:
+                reader = csv.reader(f)
+                next(reader, None)  # 跳过表头
 
-            for i in range(1, sheet.nrows):  # 跳过表头
-                word = sheet.cell_value(i, 1)  # 第2列是单词
-                if word:
+                for row in reader:
+                    if len(row) < 2 or not row[1]:  # 第2列是单词
+                        continue
                     # 清理单词（去除空格、处理 a(an) 这种格式）
-                    word = str(word).strip().replace('\xa0', '')
+                    word = row[1].strip().replace('\xa0', '')
                     # 处理 "a(an)" 这种格式，提取主单词
                     if '(' in word:
                         word = word.split('(')[0].strip()
@@ -285,214 +424,144 @@ class VocabularyBuilder:
         except Exception as e:
             print(f"  Error loading Gaokao vocabulary: {e}")
 
-    def load_stardict(self) -> None:
-        """加载 ECDICT stardict 数据库"""
+    def load_stardict(self) -> Iterator[WordEntry]:
+        """逐行读取 ECDICT stardict 数据库，生成有效词条（不在内存中整体保留）"""
         print("Loading ECDICT stardict database...")
-        db_path = os.path.join(self.data_dir, "stardict 2.db")
+        db_path = self.stardict_path
 
         if not os.path.exists(db_path):
             print(f"  Warning: {db_path} not found")
             return
 
-        conn = sqlite3.connect(db_path)
-        cursor = conn.cursor()
+        with closing(sqlite3.connect(db_path)) as conn:
+            cursor = conn.cursor()
 
-        # 查询所有词条
-        cursor.execute("""
-            SELECT word, phonetic, definition, translation, pos,
-                   collins, oxford, tag, bnc, frq, exchange
-            FROM stardict
-        """)
-
-        loaded = 0
-        for row in cursor.fetchall():
-            word = row[0].lower().strip() if row[0] else ""
-
-            if not word or not self._is_valid_word(word):
-                continue
-
-            # 解析标签
-            tag = row[7] or ""
-            tags = set(tag.split())
-
-            entry = WordEntry(
-                word=word,
-                phonetic=row[1] or "",
-                definition_en=row[2] or "",
-                definition_cn=row[3] or "",
-                pos=row[4] or "",
-                collins_star=row[5] or 0,
-                is_oxford_3000=bool(row[6]),
-                bnc_rank=row[8] or 0,
-                exchange=row[10] or "",
-                # 考试标签
-                is_zk='zk' in tags,
-                is_gk='gk' in tags,
-                is_cet4='cet4' in tags,
-                is_cet6='cet6' in tags,
-                is_ky='ky' in tags,
-                is_toefl='toefl' in tags,
-                is_ielts='ielts' in tags,
-                is_gre='gre' in tags,
-                data_sources="ecdict"
+            # 只靠 COCA 词表或高考词表才能入选的词，放入临时表供 SQL 预筛选使用
+            cursor.execute("CREATE TEMP TABLE rescue (word TEXT PRIMARY KEY)")
+            cursor.executemany(
+                "INSERT OR IGNORE INTO rescue VALUES (?)",
+                ((word,) for word, rank in self.coca_ranks.items() if rank <= self.COCA_THRESHOLD),
+            )
+            cursor.executemany(
+                "INSERT OR IGNORE INTO rescue VALUES (?)",
+                ((word,) for word in self.gaokao_words),
             )
 
-            # ECDICT 的 frq 字段 (COCA 词频)
-            if row[9]:
-                entry.coca_rank = row[9]
-
-            self.words[word] = entry
-            loaded += 1
+            # 查询词条并在 SQL 中预先排除不可能入库的行（先筛选、后解析）：
+            # - 1-2 字母的词只保留白名单内的
+            # - 只保留可能满足 _should_include 的行（宽松条件，最终仍由 Python 判断）
+            # 两个条件都对含非可打印 ASCII 字符（制表符、\xa0 等）的词放行：
+            # SQLite 的 lower/trim 与 Python 的 lower/strip 对这些字符处理不一致
+            # 音标、释义、词形变化不在此读取，入库时在 SQLite 内按 rowid 拷贝
+            short_words = sorted(self.ALLOWED_SHORT)
+            placeholders = ", ".join("?" * len(short_words))
+            cursor.execute(f"""
+                SELECT rowid, word, pos, collins, oxford, tag, bnc, frq
+                FROM stardict
+                WHERE (length(trim(word)) > 2
+                       OR word GLOB '*[^ -~]*'
+                       OR lower(trim(word)) IN ({placeholders}))
+                  AND (oxford != 0
+                       OR tag != ''
+                       OR collins >= 3
+                       OR (bnc > 0 AND bnc <= ?)
+                       OR (frq > 0 AND frq <= ?)
+                       OR word GLOB '*[^ -~]*'
+                       OR lower(trim(word)) IN (SELECT word FROM rescue))
+            """, (*short_words, self.BNC_THRESHOLD, self.COCA_THRESHOLD))
+
+            # 循环内频繁使用的属性先取到局部变量
+            exam_tags = self._EXAM_TAGS
+            gaokao_words = self.gaokao_words
+            is_valid_word = self._is_valid_word
+
+            loaded = 0
+            for row in cursor:
+                word = normalize_word(row[1])
+
+                if not word or not is_valid_word(word):
+                    continue
 
-        conn.close()
+                # 解析标签：一次求交集，只保留考试标签
+                tags = exam_tags.intersection((row[5] or "").split())
+
+                entry = WordEntry(
+                    word=word,
+                    src_rowid=row[0],
+                    pos=row[2] or "",
+                    collins_star=row[3] or 0,
+                    is_oxford_3000=bool(row[4]),
+                    bnc_rank=row[6] or 0,
+                    # 考试标签
+                    is_zk='zk' in tags,
+                    # 高考：ECDICT 标签或高考 3500 词表
+                    is_gk='gk' in tags or word in gaokao_words,
+                    is_cet4='cet4' in tags,
+                    is_cet6='cet6' in tags,
+                    is_ky='ky' in tags,
+                    is_toefl='toefl' in tags,
+                    is_ielts='ielts' in tags,
+                    is_gre='gre' in tags,
+                    data_sources={"ecdict"}
+                )
+
+                # ECDICT 的 frq 字段 (COCA 词频)
+                if row[7]:
+                    entry.coca_rank = row[7]
+
+                loaded += 1
+                yield entry
         print(f"  Loaded {loaded} words from stardict")
 
-    def _normalize_pos(self, raw_pos: str) -> str:
-        """
-        标准化词性格式
-        输入: "a:99/t:1" 或 "n:100" 或 "noun" 等
-        输出: "adj,v" 或 "n" 等（统一格式，按频率排序）
-        """
-        if not raw_pos:
-            return ""
-
-        pos_list = []
-
-        # 解析 ECDICT 格式: "a:99/t:1" 或 "n:4/v:96"
-        if ':' in raw_pos:
-            parts = raw_pos.split('/')
-            pos_freq = []
-            for part in parts:
-                if ':' in part:
-                    pos_code, freq_str = part.split(':')
-                    pos_code = pos_code.strip().lower()
-                    try:
-                        freq = int(freq_str)
-                    except ValueError:
-                        freq = 0
-                    # 标准化词性
-                    std_pos = POS_STANDARD.get(pos_code, '')
-                    if std_pos and std_pos != 'unknown':
-                        pos_freq.append((std_pos, freq))
-
-            # 按频率降序排序，去重
-            pos_freq.sort(key=lambda x: -x[1])
-            seen = set()
-            for pos, _ in pos_freq:
-                if pos not in seen:
-                    pos_list.append(pos)
-                    seen.add(pos)
-        else:
-            # 简单格式: "noun" 或 "n"
-            pos_code = raw_pos.strip().lower()
-            std_pos = POS_STANDARD.get(pos_code, '')
-            if std_pos and std_pos != 'unknown':
-                pos_list.append(std_pos)
-
-        return ','.join(pos_list)
-
-    def _get_pos_from_wordnet(self, word: str) -> str:
-        """从 WordNet 获取词性（按使用频率排序）"""
-        if not WORDNET_AVAILABLE:
-            return ""
-
-        try:
-            synsets = wn.synsets(word)
-            if not synsets:
-                return ""
-
-            # 统计各词性的 synset 数量（作为频率近似）
-            pos_count = {}
-            for syn in synsets:
-                pos = syn.pos()
-                std_pos = POS_STANDARD.get(pos, '')
-                if std_pos and std_pos != 'unknown':
-                    pos_count[std_pos] = pos_count.get(std_pos, 0) + 1
-
-            # 按数量降序排序
-            sorted_pos = sorted(pos_count.items(), key=lambda x: -x[1])
-            return ','.join([p for p, _ in sorted_pos])
-        except Exception:
-            return ""
-
-    def enrich_with_pos(self) -> None:
-        """标准化词性并用 WordNet 补充缺失数据"""
-        print("Standardizing and enriching POS data...")
-        standardized = 0
-        enriched_from_wordnet = 0
+    def enrich_words(self, entries: Iterable[WordEntry]) -> Iterator[WordEntry]:
+        """逐条增强词条：标准化词性、WordNet 补充、COCA 词频、CEFR 等级"""
+        stats = {
+            'standardized': 0,
+            'wordnet': 0,
+            'coca': 0,
+            'cefr': 0,
+        }
 
-        for word, entry in self.words.items():
-            original_pos = entry.pos
+        for entry in entries:
+            word = entry.word
 
             # 先标准化现有的 pos
-            if original_pos:
-                entry.pos = self._normalize_pos(original_pos)
+            if entry.pos:
+                entry.pos = normalize_pos(entry.pos)
                 if entry.pos:
-                    standardized += 1
+                    stats['standardized'] += 1
 
             # 如果没有词性或为空，从 WordNet 补充
             if not entry.pos and WORDNET_AVAILABLE:
-                wordnet_pos = self._get_pos_from_wordnet(word)
+                wordnet_pos = get_pos_from_wordnet(word)
                 if wordnet_pos:
                     entry.pos = wordnet_pos
-                    if "wordnet" not in entry.data_sources:
-                        entry.data_sources += ",wordnet"
-                    enriched_from_wordnet += 1
-
-        print(f"  Standardized {standardized} POS entries")
-        print(f"  Enriched {enriched_from_wordnet} words with WordNet POS")
-
-    def enrich_with_coca(self) -> None:
-        """用 COCA 数据增强词频信息（COCA 更权威）"""
-        print("Enriching with COCA frequency data...")
-        enriched = 0
-
-        for word, rank in self.coca_ranks.items():
-            if word in self.words:
-                # COCA 优先级更高，覆盖 ECDICT 的 frq
-                self.words[word].coca_rank = rank
-                if "coca" not in self.words[word].data_sources:
-                    self.words[word].data_sources += ",coca"
-                enriched += 1
-
-        print(f"  Enriched {enriched} words with COCA ranks")
-
-    def enrich_with_cefr(self) -> None:
-        """用 CEFR 数据库添加 CEFR 等级"""
-        if not self.cefr_data:
-            print("Skipping CEFR enrichment (no CEFR data loaded)")
-            return
-
-        print("Enriching with CEFR levels...")
-        enriched = 0
-
-        for word, entry in self.words.items():
-            if word in self.cefr_data:
-                level = self.cefr_data[word]
+                    entry.data_sources.add("wordnet")
+                    stats['wordnet'] += 1
+
+            # COCA 优先级更高，覆盖 ECDICT 的 frq
+            rank = self.coca_ranks.get(word)
+            if rank:
+                entry.coca_rank = rank
+                entry.data_sources.add("coca")
+                stats['coca'] += 1
+
+            # 添加 CEFR 等级
+            level = self.cefr_data.get(word)
+            if level:
                 cefr_str = cefr_from_float(level)
                 if cefr_str:
                     entry.cefr_level = cefr_str
-                    if "cefr" not in entry.data_sources:
-                        entry.data_sources += ",cefr"
-                    enriched += 1
-
-        print(f"  Added CEFR levels to {enriched} words")
-
-    def enrich_with_gaokao(self) -> None:
-        """标注高考词汇"""
-        if not self.gaokao_words:
-            print("Skipping Gaokao enrichment (no Gaokao data loaded)")
-            return
+                    entry.data_sources.add("cefr")
+                    stats['cefr'] += 1
 
-        print("Enriching with Gaokao tags...")
-        enriched = 0
+            yield entry
 
-        for word, entry in self.words.items():
-            if word in self.gaokao_words:
-                entry.is_gk = True
-                enriched += 1
-
-        print(f"  Tagged {enriched} words as Gaokao vocabulary")
+        print(f"  Enrichment results:")
+        print(f"    - Standardized POS: {stats['standardized']}")
+        print(f"    - WordNet POS: {stats['wordnet']}")
+        print(f"    - COCA ranks: {stats['coca']}")
+        print(f"    - CEFR levels: {stats['cefr']}")
 
     def _is_valid_word(self, word: str) -> bool:
         """检查单词是否有效"""
@@ -502,18 +571,18 @@ class VocabularyBuilder:
         if word_lower in self.STOPWORDS:
             return False
 
-        # 单字母特殊处理
-        if len(word) == 1:
-            return word_lower in self.ALLOWED_SINGLE_LETTERS
+        # 单字母/双字母词只保留白名单内的
+        if len(word) <= 2:
+            return word_lower in self.ALLOWED_SHORT
 
-        # 双字母特殊处理
-        if len(word) == 2:
-            return word_lower in self.ALLOWED_TWO_LETTERS
+        # 常见情况：纯 ASCII 字母词，排除模式中只有“重复字母词”可能命中，
+        # 直接用字符集合判断，无需走正则
+        if word_lower.isascii() and word_lower.isalpha():
+            return len(set(word_lower)) > 1
 
         # 检查排除模式
-        for pattern in self.EXCLUDE_PATTERNS:
-            if re.match(pattern, word_lower):
-                return False
+        if self._EXCLUDE_RE.match(word_lower):
+            return False
 
         return True
 
@@ -524,11 +593,9 @@ class VocabularyBuilder:
             return True
 
         # 规则2: 任意考试标签
-        if any([
-            entry.is_cet4, entry.is_cet6, entry.is_ky,
-            entry.is_toefl, entry.is_ielts, entry.is_gre,
-            entry.is_gk, entry.is_zk
-        ]):
+        if (entry.is_cet4 or entry.is_cet6 or entry.is_ky or
+                entry.is_toefl or entry.is_ielts or entry.is_gre or
+                entry.is_gk or entry.is_zk):
             return True
 
         # 规则3: 高词频词汇
@@ -544,35 +611,33 @@ class VocabularyBuilder:
 
         return False
 
-    def filter_words(self) -> Dict[str, WordEntry]:
+    def filter_words(self, entries: Iterable[WordEntry]) -> Iterator[WordEntry]:
         """筛选高价值词汇"""
-        print("Filtering high-value vocabulary...")
+        # 同一单词可能出现多行（如 May/may），入库时后出现的行覆盖前者，
+        # 统计也按单词去重、以最后一行为准
+        flags: Dict[str, Tuple[bool, bool, bool, bool]] = {}
 
-        filtered = {}
+        for entry in entries:
+            if self._should_include(entry):
+                flags[entry.word] = (
+                    entry.is_oxford_3000,
+                    bool(entry.is_cet4 or entry.is_cet6 or entry.is_ky or
+                         entry.is_toefl or entry.is_ielts or entry.is_gre),
+                    bool((entry.coca_rank and entry.coca_rank <= self.COCA_THRESHOLD) or
+                         (entry.bnc_rank and entry.bnc_rank <= self.BNC_THRESHOLD)),
+                    bool(entry.collins_star and entry.collins_star >= 3),
+                )
+                yield entry
+
+        oxford, exam, high_freq, collins = [sum(col) for col in zip(*flags.values())] or [0, 0, 0, 0]
         stats = {
-            'oxford_3000': 0,
-            'exam_words': 0,
-            'high_freq': 0,
-            'collins_3plus': 0,
-            'total': 0
+            'oxford_3000': oxford,
+            'exam_words': exam,
+            'high_freq': high_freq,
+            'collins_3plus': collins,
+            'total': len(flags)
         }
 
-        for word, entry in self.words.items():
-            if self._should_include(entry):
-                filtered[word] = entry
-                stats['total'] += 1
-
-                if entry.is_oxford_3000:
-                    stats['oxford_3000'] += 1
-                if any([entry.is_cet4, entry.is_cet6, entry.is_ky,
-                       entry.is_toefl, entry.is_ielts, entry.is_gre]):
-                    stats['exam_words'] += 1
-                if (entry.coca_rank and entry.coca_rank <= self.COCA_THRESHOLD) or \
-                   (entry.bnc_rank and entry.bnc_rank <= self.BNC_THRESHOLD):
-                    stats['high_freq'] += 1
-                if entry.collins_star and entry.collins_star >= 3:
-                    stats['collins_3plus'] += 1
-
         print(f"  Filtered results:")
         print(f"    - Oxford 3000: {stats['oxford_3000']}")
         print(f"    - Exam words: {stats['exam_words']}")
@@ -580,8 +645,6 @@ class VocabularyBuilder:
         print(f"    - Collins 3+: {stats['collins_3plus']}")
         print(f"    - Total selected: {stats['total']}")
 
-        return filtered
-
     def build_database(self, output_path: str) -> None:
         """构建最终的 SQLite 数据库"""
         print(f"Building output database: {output_path}")
@@ -590,92 +653,161 @@ class VocabularyBuilder:
         if os.path.exists(output_path):
             os.remove(output_path)
 
-        conn = sqlite3.connect(output_path)
-        cursor = conn.cursor()
-
-        # 创建主表
-        cursor.execute("""
-            CREATE TABLE words (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                word TEXT NOT NULL UNIQUE,
-                phonetic TEXT,
-                definition_en TEXT,
-                definition_cn TEXT,
-                pos TEXT,
-
-                cefr_level TEXT,
-                collins_star INTEGER DEFAULT 0,
-                coca_rank INTEGER DEFAULT 0,
-                bnc_rank INTEGER DEFAULT 0,
-
-                is_oxford_3000 INTEGER DEFAULT 0,
-                is_cet4 INTEGER DEFAULT 0,
-                is_cet6 INTEGER DEFAULT 0,
-                is_zk INTEGER DEFAULT 0,
-                is_gk INTEGER DEFAULT 0,
-                is_ky INTEGER DEFAULT 0,
-                is_toefl INTEGER DEFAULT 0,
-                is_ielts INTEGER DEFAULT 0,
-                is_gre INTEGER DEFAULT 0,
-
-                exchange TEXT,
-                data_sources TEXT
-            )
-        """)
-
-        # 创建索引
-        cursor.execute("CREATE INDEX idx_word ON words(word)")
-        cursor.execute("CREATE INDEX idx_cefr ON words(cefr_level)")
-        cursor.execute("CREATE INDEX idx_coca ON words(coca_rank)")
-        cursor.execute("CREATE INDEX idx_oxford ON words(is_oxford_3000)")
-
-        # 筛选并插入数据
-        filtered = self.filter_words()
-
-        for entry in filtered.values():
+        # 自动提交模式，事务由下方显式的 BEGIN/COMMIT 控制；
+        # uri=True 以便用 URI 只读挂载 stardict（普通路径仍按文件名处理）
+        conn = sqlite3.connect(output_path, uri=True, isolation_level=None, cached_statements=512)
+        with closing(conn):
+            cursor = conn.cursor()
+
+            # 批量写入调优：输出库每次都从零重建，构建中途失败直接重跑即可，
+            # 因此关闭回滚日志和同步落盘。不使用 WAL：应用以只读方式打开词库，
+            # WAL 模式会写入文件头，只读目录下无法创建 -shm 文件
+            cursor.executescript("""
+                PRAGMA main.journal_mode=OFF;
+                PRAGMA main.synchronous=OFF;
+                PRAGMA temp_store=MEMORY;
+                PRAGMA main.cache_size=-200000;
+            """)
+
+            # 创建主表
+            cursor.execute("""
+                CREATE TABLE words (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    word TEXT NOT NULL UNIQUE,
+                    phonetic TEXT,
+                    definition_en TEXT,
+                    definition_cn TEXT,
+                    pos TEXT,
+
+                    cefr_level TEXT,
+                    collins_star INTEGER DEFAULT 0,
+                    coca_rank INTEGER DEFAULT 0,
+                    bnc_rank INTEGER DEFAULT 0,
+
+                    is_oxford_3000 INTEGER DEFAULT 0,
+                    is_cet4 INTEGER DEFAULT 0,
+                    is_cet6 INTEGER DEFAULT 0,
+                    is_zk INTEGER DEFAULT 0,
+                    is_gk INTEGER DEFAULT 0,
+                    is_ky INTEGER DEFAULT 0,
+                    is_toefl INTEGER DEFAULT 0,
+                    is_ielts INTEGER DEFAULT 0,
+                    is_gre INTEGER DEFAULT 0,
+
+                    exchange TEXT,
+                    data_sources TEXT
+                )
+            """)
+
+            # 临时表：暂存 Python 中计算的字段，文本列稍后在 SQLite 内补齐
+            cursor.execute("""
+                CREATE TEMP TABLE picked (
+                    src_rowid INTEGER NOT NULL,
+                    word TEXT NOT NULL UNIQUE,
+                    pos TEXT,
+                    cefr_level TEXT,
+                    collins_star INTEGER,
+                    coca_rank INTEGER,
+                    bnc_rank INTEGER,
+                    is_oxford_3000 INTEGER,
+                    is_cet4 INTEGER,
+                    is_cet6 INTEGER,
+                    is_zk INTEGER,
+                    is_gk INTEGER,
+                    is_ky INTEGER,
+                    is_toefl INTEGER,
+                    is_ielts INTEGER,
+                    is_gre INTEGER,
+                    data_sources TEXT
+                )
+            """)
+
+            # 挂载 stardict，音标、释义、词形变化直接在库内拷贝，不经过 Python
+            # （ATTACH 不能在事务内执行；文件不存在时不挂载，避免创建空库）
+            # 以 mode=ro 只读挂载，构建过程不会改动数据源，也不受上面 PRAGMA 的影响
+            has_stardict = os.path.exists(self.stardict_path)
+            if has_stardict:
+                src_uri = Path(self.stardict_path).resolve().as_uri() + "?mode=ro"
+                cursor.execute("ATTACH DATABASE ? AS src", (src_uri,))
+
+            # 流式处理：读取 stardict -> 数据增强 -> 筛选，在单个事务内批量插入。
+            # 同一单词可能对应多行（如 May/may），取最后一条入选行的值、首次入选的位置
+            entries = self.filter_words(self.enrich_words(self.load_stardict()))
+
+            # 每条语句插入 INSERT_BATCH_ROWS 行，减少逐行的语句调度开销；
+            # 批量语句只编译一次，之后由语句缓存复用，最后不足一批的单独插入
+            rows = (entry_to_tuple(entry) for entry in entries)
+            batch_sql = insert_sql(INSERT_BATCH_ROWS)
+
+            cursor.execute("BEGIN")
+            while True:
+                batch = list(islice(rows, INSERT_BATCH_ROWS))
+                if len(batch) < INSERT_BATCH_ROWS:
+                    break
+                cursor.execute(batch_sql, tuple(chain.from_iterable(batch)))
+            if batch:
+                cursor.execute(insert_sql(len(batch)), tuple(chain.from_iterable(batch)))
+
+            if has_stardict:
+                # 入库顺序（即 id）按单词在 stardict 中首次出现的位置，与逐行读入 dict 的顺序一致；
+                # 首行可能未入选或已在 SQL 中被预筛掉，因此对全表按规范化单词分组取最小 rowid。
+                # 纯可打印 ASCII 的词 SQLite 的 lower/trim 与 normalize_word 一致，其余交给 Python
+                conn.create_function("normalize_word", 1, normalize_word, deterministic=True)
+                cursor.execute("""
+                    CREATE TEMP TABLE first_seen (
+                        word TEXT PRIMARY KEY,
+                        first_rowid INTEGER NOT NULL
+                    )
+                """)
+                cursor.execute("""
+                    INSERT INTO first_seen (word, first_rowid)
+                    SELECT CASE WHEN word GLOB '*[^ -~]*' THEN normalize_word(word)
+                                ELSE lower(trim(word)) END AS norm,
+                           MIN(rowid)
+                    FROM src.stardict
+                    WHERE word IS NOT NULL
+                    GROUP BY norm
+                """)
+
+                cursor.execute("""
+                    INSERT INTO words (
+                        word, phonetic, definition_en, definition_cn, pos,
+                        cefr_level, collins_star, coca_rank, bnc_rank,
+                        is_oxford_3000, is_cet4, is_cet6, is_zk, is_gk, is_ky,
+                        is_toefl, is_ielts, is_gre, exchange, data_sources
+                    )
+                    SELECT p.word, COALESCE(s.phonetic, ''), COALESCE(s.definition, ''),
+                           COALESCE(s.translation, ''), p.pos,
+                           p.cefr_level, p.collins_star, p.coca_rank, p.bnc_rank,
+                           p.is_oxford_3000, p.is_cet4, p.is_cet6, p.is_zk, p.is_gk, p.is_ky,
+                           p.is_toefl, p.is_ielts, p.is_gre, COALESCE(s.exchange, ''),
+                           p.data_sources
+                    FROM picked p
+                    JOIN src.stardict s ON s.rowid = p.src_rowid
+                    JOIN first_seen f ON f.word = p.word
+                    ORDER BY f.first_rowid
+                """)
+
+            # 数据写入完成后再建索引，避免逐行维护索引
+            cursor.execute("CREATE INDEX idx_word ON words(word)")
+            cursor.execute("CREATE INDEX idx_cefr ON words(cefr_level)")
+            cursor.execute("CREATE INDEX idx_coca ON words(coca_rank)")
+            cursor.execute("CREATE INDEX idx_oxford ON words(is_oxford_3000)")
+
+            cursor.execute("COMMIT")
+            cursor.execute("DROP TABLE picked")
+            if has_stardict:
+                cursor.execute("DROP TABLE first_seen")
+                cursor.execute("DETACH DATABASE src")
+
+            # 输出统计（一次扫描得到全部计数）
             cursor.execute("""
-                INSERT INTO words (
-                    word, phonetic, definition_en, definition_cn, pos,
-                    cefr_level, collins_star, coca_rank, bnc_rank,
-                    is_oxford_3000, is_cet4, is_cet6, is_zk, is_gk, is_ky,
-                    is_toefl, is_ielts, is_gre, exchange, data_sources
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """, (
-                entry.word,
-                entry.phonetic,
-                entry.definition_en,
-                entry.definition_cn,
-                entry.pos,
-                entry.cefr_level,
-                entry.collins_star,
-                entry.coca_rank,
-                entry.bnc_rank,
-                int(entry.is_oxford_3000),
-                int(entry.is_cet4),
-                int(entry.is_cet6),
-                int(entry.is_zk),
-                int(entry.is_gk),
-                int(entry.is_ky),
-                int(entry.is_toefl),
-                int(entry.is_ielts),
-                int(entry.is_gre),
-                entry.exchange,
-                entry.data_sources
-            ))
-
-        conn.commit()
-
-        # 输出统计
-        cursor.execute("SELECT COUNT(*) FROM words")
-        total = cursor.fetchone()[0]
-
-        cursor.execute("SELECT COUNT(*) FROM words WHERE cefr_level != ''")
-        with_cefr = cursor.fetchone()[0]
-
-        cursor.execute("SELECT COUNT(*) FROM words WHERE definition_cn != ''")
-        with_cn = cursor.fetchone()[0]
-
-        conn.close()
+                SELECT COUNT(*),
+                       COALESCE(SUM(cefr_level != ''), 0),
+                       COALESCE(SUM(definition_cn != ''), 0)
+                FROM words
+            """)
+            total, with_cefr, with_cn = cursor.fetchone()
 
         print(f"\nDatabase built successfully!")
         print(f"  - Total words: {total}")
@@ -689,19 +821,16 @@ class VocabularyBuilder:
         print("Verboo Vocabulary Database Builder")
         print("=" * 60)
 
-        # 1. 加载数据源
-        self.load_coca_frequency()
-        self.load_cefr_database()
-        self.load_gaokao_vocabulary()
-        self.load_stardict()
+        # 1. 并发加载辅助数据源（体量小，常驻内存；各自读取独立文件、写入独立属性）
+        loaders = [
+            self.load_coca_frequency,
+            self.load_cefr_database,
+            self.load_gaokao_vocabulary,
+        ]
+        with ThreadPoolExecutor(max_workers=len(loaders)) as executor:
+            list(executor.map(lambda load: load(), loaders))
 
-        # 2. 数据增强（准确性优先）
-        self.enrich_with_pos()    # 标准化词性 + WordNet 补充
-        self.enrich_with_coca()   # COCA 覆盖 ECDICT 的 frq
-        self.enrich_with_cefr()   # 添加 CEFR
-        self.enrich_with_gaokao() # 标注高考词汇
-
-        # 3. 构建输出数据库
+        # 2. 流式读取 stardict，增强、筛选后直接写入输出数据库
         self.build_database(output_path)
 
         print("\nDone!")
@@ -721,29 +850,27 @@ def main():
     print("Sample queries from the built database:")
     print("=" * 60)
 
-    conn = sqlite3.connect(output_path)
-    cursor = conn.cursor()
-
-    # 示例：查询几个典型词汇
-    test_words = ['accomplish', 'take', 'resilience', 'albeit', 'ubiquitous']
-    for word in test_words:
-        cursor.execute("""
-            SELECT word, cefr_level, coca_rank, definition_cn,
-                   is_toefl, is_ielts, is_gre
-            FROM words WHERE word = ?
-        """, (word,))
-        row = cursor.fetchone()
-        if row:
-            exams = []
-            if row[4]: exams.append('TOEFL')
-            if row[5]: exams.append('IELTS')
-            if row[6]: exams.append('GRE')
-            print(f"\n  {row[0]}:")
-            print(f"    CEFR: {row[1] or 'N/A'}, COCA: {row[2] or 'N/A'}")
-            print(f"    中文: {row[3][:50] if row[3] else 'N/A'}...")
-            print(f"    考试: {', '.join(exams) if exams else 'None'}")
-
-    conn.close()
+    with closing(sqlite3.connect(output_path)) as conn:
+        cursor = conn.cursor()
+
+        # 示例：查询几个典型词汇
+        test_words = ['accomplish', 'take', 'resilience', 'albeit', 'ubiquitous']
+        for word in test_words:
+            cursor.execute("""
+                SELECT word, cefr_level, coca_rank, definition_cn,
+                       is_toefl, is_ielts, is_gre
+                FROM words WHERE word = ?
+            """, (word,))
+            row = cursor.fetchone()
+            if row:
+                exams = []
+                if row[4]: exams.append('TOEFL')
+                if row[5]: exams.append('IELTS')
+                if row[6]: exams.append('GRE')
+                print(f"\n  {row[0]}:")
+                print(f"    CEFR: {row[1] or 'N/A'}, COCA: {row[2] or 'N/A'}")
+                print(f"    中文: {row[3][:50] if row[3] else 'N/A'}...")
+                print(f"    考试: {', '.join(exams) if exams else 'None'}")
 
 
 if __name__ == "__main__":